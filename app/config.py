@@ -11,15 +11,37 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 
+# Metadata DB Configuration. Runs in WAL mode, so processes sharing it must also
+# share its directory (the -wal/-shm files live next to the db file).
+METADATA_DB_PATH = os.getenv("METADATA_DB_PATH", "metadata.db")
+
 # ChromaDB Configuration
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 
+# Scraper Configuration (pages larger than this are truncated)
+SCRAPER_MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", 5_000_000))
+
 # Application Configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", 8000))
 
 # Embedding Model
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# Embedding backend: "onnx" (int8-quantized ONNX Runtime) or "torch" (SentenceTransformer)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_model")
+
+# ONNX Runtime intra-op threads. Defaults to the CPUs this process may run on;
+# set explicitly when a container CPU quota is lower than that.
+ONNX_NUM_THREADS = int(os.getenv(
+    "ONNX_NUM_THREADS",
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+))
+
+# Max chunks embedded and written to ChromaDB per call (bounds peak memory)
+CHROMA_INSERT_BATCH_SIZE = int(os.getenv("CHROMA_INSERT_BATCH_SIZE", 256))
 
 # Collection name for ChromaDB
 COLLECTION_NAME = "web_documents"
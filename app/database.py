@@ -1,84 +1,147 @@
+import os
 import sqlite3
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from app.config import METADATA_DB_PATH
 
 class MetadataDB:
     """Simple SQLite database to track URL ingestion status and metadata"""
     
-    def __init__(self, db_path: str = "metadata.db"):
+    def __init__(self, db_path: str = METADATA_DB_PATH):
         self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        
+        # Single long-lived connection for writes, in autocommit mode
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=5000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-20000;
+        """)
         self.init_db()
+        
+        # Separate read-only connection so readers don't block behind writers under WAL
+        self._read_conn = sqlite3.connect(
+            f"file:{db_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._read_conn.execute("PRAGMA busy_timeout=5000")
     
     def init_db(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS urls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT UNIQUE NOT NULL,
-                status TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                error_message TEXT,
-                chunks_count INTEGER DEFAULT 0
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT UNIQUE NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    error_message TEXT,
+                    chunks_count INTEGER DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status)")
+            
+            # Content-addressed embedding cache (hash of chunk text -> raw vector bytes).
+            # Unbounded: it grows ~800 B per distinct chunk and is never evicted.
+            # Clear it with DELETE FROM embeddings_cache if it gets too large.
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings_cache (
+                    hash BLOB PRIMARY KEY,
+                    vec BLOB NOT NULL
+                ) WITHOUT ROWID
+            """)
     
     def add_url(self, url: str) -> int:
         """Add a new URL with pending status"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         now = datetime.now().isoformat()
         
-        try:
-            cursor.execute("""
+        with self._lock:
+            # Insert or touch the existing row in a single statement
+            cursor = self._conn.execute("""
                 INSERT INTO urls (url, status, created_at, updated_at)
                 VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET updated_at = excluded.updated_at
+                RETURNING id
             """, (url, "pending", now, now))
-            
-            url_id = cursor.lastrowid
-            conn.commit()
-            return url_id
-        except sqlite3.IntegrityError:
-            # URL already exists
-            cursor.execute("SELECT id FROM urls WHERE url = ?", (url,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-        finally:
-            conn.close()
+            return cursor.fetchone()[0]
     
     def update_status(self, url: str, status: str, error_message: Optional[str] = None, chunks_count: int = 0):
         """Update the status of a URL"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        now = datetime.now().isoformat()
+        
+        with self._lock:
+            self._conn.execute("""
+                UPDATE urls
+                SET status = ?, updated_at = ?, error_message = ?, chunks_count = ?
+                WHERE url = ?
+            """, (status, now, error_message, chunks_count, url))
+    
+    def update_statuses_bulk(self, records: List[Tuple[str, str, Optional[str], int]]):
+        """Update the status of several URLs in one transaction
         
+        Each record is a (url, status, error_message, chunks_count) tuple.
+        """
         now = datetime.now().isoformat()
         
-        cursor.execute("""
-            UPDATE urls
-            SET status = ?, updated_at = ?, error_message = ?, chunks_count = ?
-            WHERE url = ?
-        """, (status, now, error_message, chunks_count, url))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("""
+                    UPDATE urls
+                    SET status = ?, updated_at = ?, error_message = ?, chunks_count = ?
+                    WHERE url = ?
+                """, [
+                    (status, now, error_message, chunks_count, url)
+                    for url, status, error_message, chunks_count in records
+                ])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def get_cached_embeddings(self, hashes: List[bytes]) -> Dict[bytes, bytes]:
+        """Look up cached embedding bytes for the given chunk hashes"""
+        if not hashes:
+            return {}
+        
+        placeholders = ",".join("?" * len(hashes))
+        cursor = self._read_conn.execute(
+            f"SELECT hash, vec FROM embeddings_cache WHERE hash IN ({placeholders})",
+            hashes
+        )
+        return dict(cursor.fetchall())
+    
+    def cache_embeddings(self, items: List[Tuple[bytes, bytes]]):
+        """Store (hash, embedding bytes) pairs in one transaction"""
+        if not items:
+            return
         
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings_cache (hash, vec) VALUES (?, ?)",
+                    items
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
     
     def get_url_status(self, url: str) -> Optional[Dict]:
         """Get the status of a specific URL"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._read_conn.cursor()
         
         cursor.execute("SELECT * FROM urls WHERE url = ?", (url,))
         result = cursor.fetchone()
         
-        conn.close()
-        
         if result:
             return {
                 "id": result[0],
@@ -93,14 +156,11 @@ class MetadataDB:
     
     def get_all_urls(self) -> List[Dict]:
         """Get all URLs with their status"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._read_conn.cursor()
         
         cursor.execute("SELECT * FROM urls ORDER BY created_at DESC")
         results = cursor.fetchall()
         
-        conn.close()
-        
         urls = []
         for result in results:
             urls.append({
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+from typing import List, Union
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+
+def export_model(model_name: str, model_dir: str):
+    """Export the model to ONNX and quantize it with dynamic int8 (VNNI)
+    
+    The export is written to a temporary sibling directory and renamed into
+    place, so concurrent exporters never expose a half-written model_dir.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    
+    parent_dir = os.path.dirname(os.path.abspath(model_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".onnx_export_", dir=parent_dir)
+    
+    try:
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+        
+        quantizer = ORTQuantizer.from_pretrained(model)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+        quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+        
+        try:
+            os.rename(tmp_dir, model_dir)
+        except OSError:
+            # Another process finished its export first; keep that one
+            if not os.path.exists(os.path.join(model_dir, "model_quantized.onnx")):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+class OnnxEmbedder:
+    """Int8-quantized ONNX Runtime encoder with a SentenceTransformer-compatible encode()"""
+    
+    # Same truncation length sentence-transformers uses for all-MiniLM-L6-v2
+    max_seq_length = 256
+    
+    def __init__(self, model_name: str, model_dir: str, num_threads: int):
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            export_model(model_name, model_dir)
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+    
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """Embed sentences with mean pooling; always returns a float32 ndarray"""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in tokens.items()
+                if name in self._input_names
+            }
+            token_embeddings = self.session.run(None, feeds)[0]
+            
+            # Mean-pool over non-padding tokens
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            
+            if normalize_embeddings:
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings = embeddings / np.clip(norms, 1e-12, None)
+            
+            batches.append(embeddings.astype(np.float32))
+        
+        if not batches:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        
+        embeddings = np.vstack(batches)
+        return embeddings[0] if single else embeddings
+
+
+if __name__ == "__main__":
+    # Pre-export the model (used by the Docker build)
+    from app.config import EMBEDDING_MODEL, ONNX_MODEL_DIR
+    
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, "model_quantized.onnx")):
+        export_model(EMBEDDING_MODEL, ONNX_MODEL_DIR)
@@ -1,15 +1,23 @@
-from openai import OpenAI
-from typing import List, Dict
+from openai import AsyncOpenAI
+from typing import AsyncIterator, List, Dict
 from app.config import OPENAI_API_KEY
 
 class LLMHandler:
     """Handles LLM interactions for generating answers"""
     
+    MODEL = "gpt-3.5-turbo"
+    
+    # Static system message, built once instead of per call
+    SYSTEM_MESSAGE = {
+        "role": "system",
+        "content": "You are a helpful assistant that provides accurate answers based on given context."
+    }
+    
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     
-    def generate_answer(self, query: str, context_chunks: List[Dict]) -> str:
-        """Generate an answer based on the query and retrieved context"""
+    def _build_messages(self, query: str, context_chunks: List[Dict]) -> List[Dict]:
+        """Build the chat messages for a query and its retrieved context"""
         
         # Prepare context from retrieved chunks
         context = "\n\n".join([
@@ -28,14 +36,16 @@ Question: {query}
 
 Answer:"""
         
+        return [self.SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+    
+    async def generate_answer(self, query: str, context_chunks: List[Dict]) -> str:
+        """Generate an answer based on the query and retrieved context"""
+        
         # Call OpenAI API
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that provides accurate answers based on given context."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=self._build_messages(query, context_chunks),
                 temperature=0.7,
                 max_tokens=500
             )
@@ -46,12 +56,35 @@ Answer:"""
         except Exception as e:
             return f"Error generating answer: {str(e)}"
     
-    def generate_answer_with_sources(self, query: str, context_chunks: List[Dict]) -> Dict:
+    async def stream_answer(self, query: str, context_chunks: List[Dict]) -> AsyncIterator[str]:
+        """Generate an answer, yielding text fragments as the model produces them"""
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=self._build_messages(query, context_chunks),
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            yield f"Error generating answer: {str(e)}"
+    
+    @staticmethod
+    def extract_sources(context_chunks: List[Dict]) -> List[str]:
+        """Extract unique source URLs, keeping retrieval (best match first) order"""
+        return list(dict.fromkeys(chunk['metadata']['url'] for chunk in context_chunks))
+    
+    async def generate_answer_with_sources(self, query: str, context_chunks: List[Dict]) -> Dict:
         """Generate an answer with source citations"""
-        answer = self.generate_answer(query, context_chunks)
+        answer = await self.generate_answer(query, context_chunks)
         
         # Extract unique sources
-        sources = list(set([chunk['metadata']['url'] for chunk in context_chunks]))
+        sources = self.extract_sources(context_chunks)
         
         return {
             "answer": answer,
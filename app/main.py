@@ -1,26 +1,73 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
+from functools import wraps
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import threading
 import uvicorn
 
 from app.database import MetadataDB
-from app.queue import RedisQueue
+from app.queue import AsyncRedisQueue
 from app.vector_store import VectorStore
 from app.llm import LLMHandler
 from app.config import API_HOST, API_PORT
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the query coalescer task, without building a VectorStore that was never used
+    if get_vector_store.is_built():
+        await get_vector_store().close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AiRA - AI-powered RAG Engine",
     description="A scalable web-aware RAG system for ingesting and querying web content",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Initialize components
-db = MetadataDB()
-queue = RedisQueue()
-vector_store = VectorStore()
-llm = LLMHandler()
+def lazy_singleton(factory):
+    """Build factory() once on first call.
+    
+    FastAPI runs sync dependencies in its threadpool, so the first calls can
+    race; the lock (checked twice) ensures only one instance is ever built.
+    """
+    lock = threading.Lock()
+    instance = None
+    
+    @wraps(factory)
+    def get():
+        nonlocal instance
+        if instance is None:
+            with lock:
+                if instance is None:
+                    instance = factory()
+        return instance
+    
+    get.is_built = lambda: instance is not None
+    return get
+
+# Components are created on first use, so routes that don't need the
+# embedding model or LLM client never load them
+@lazy_singleton
+def get_db() -> MetadataDB:
+    return MetadataDB()
+
+@lazy_singleton
+def get_queue() -> AsyncRedisQueue:
+    return AsyncRedisQueue()
+
+@lazy_singleton
+def get_vector_store() -> VectorStore:
+    return VectorStore()
+
+@lazy_singleton
+def get_llm() -> LLMHandler:
+    return LLMHandler()
 
 # Request models
 class IngestURLRequest(BaseModel):
@@ -29,6 +76,7 @@ class IngestURLRequest(BaseModel):
 class QueryRequest(BaseModel):
     query: str
     top_k: Optional[int] = 5
+    stream: Optional[bool] = False
 
 # Response models
 class IngestURLResponse(BaseModel):
@@ -44,17 +92,24 @@ class QueryResponse(BaseModel):
     num_sources: int
 
 @app.get("/")
-async def root():
+async def root(
+    queue: AsyncRedisQueue = Depends(get_queue),
+    vector_store: VectorStore = Depends(get_vector_store)
+):
     """Health check endpoint"""
     return {
         "message": "AiRA RAG Engine is running!",
         "status": "healthy",
-        "redis_connected": queue.is_connected(),
+        "redis_connected": await queue.is_connected(),
         "total_documents": vector_store.get_collection_count()
     }
 
 @app.post("/ingest-url", response_model=IngestURLResponse, status_code=202)
-async def ingest_url(request: IngestURLRequest):
+async def ingest_url(
+    request: IngestURLRequest,
+    db: MetadataDB = Depends(get_db),
+    queue: AsyncRedisQueue = Depends(get_queue)
+):
     """
     Submit a URL for asynchronous processing
     
@@ -64,15 +119,15 @@ async def ingest_url(request: IngestURLRequest):
     url = str(request.url)
     
     # Check if Redis is connected
-    if not queue.is_connected():
+    if not await queue.is_connected():
         raise HTTPException(status_code=503, detail="Queue service is not available")
     
     try:
-        # Add URL to database
-        job_id = db.add_url(url)
+        # Add URL to database (off the event loop, SQLite I/O is blocking)
+        job_id = await asyncio.to_thread(db.add_url, url)
         
         # Add to processing queue
-        queue.enqueue(url)
+        await queue.enqueue(url)
         
         return IngestURLResponse(
             message="URL submitted for processing",
@@ -85,16 +140,22 @@ async def ingest_url(request: IngestURLRequest):
         raise HTTPException(status_code=500, detail=f"Failed to submit URL: {str(e)}")
 
 @app.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+async def query(
+    request: QueryRequest,
+    vector_store: VectorStore = Depends(get_vector_store),
+    llm: LLMHandler = Depends(get_llm)
+):
     """
     Query the knowledge base
     
     Searches the vector database for relevant content and generates
-    a grounded answer using an LLM.
+    a grounded answer using an LLM. With `stream` set, the answer is
+    returned as plain text as it is generated, with the sources in the
+    `X-Sources` header.
     """
     try:
         # Search vector store
-        results = vector_store.search(request.query, top_k=request.top_k)
+        results = await vector_store.search_async(request.query, top_k=request.top_k)
         
         if not results:
             raise HTTPException(
@@ -102,8 +163,16 @@ async def query(request: QueryRequest):
                 detail="No relevant documents found. Please ingest some URLs first."
             )
         
+        if request.stream:
+            sources = llm.extract_sources(results)
+            return StreamingResponse(
+                llm.stream_answer(request.query, results),
+                media_type="text/plain",
+                headers={"X-Sources": json.dumps(sources)}
+            )
+        
         # Generate answer using LLM
-        response = llm.generate_answer_with_sources(request.query, results)
+        response = await llm.generate_answer_with_sources(request.query, results)
         
         return QueryResponse(
             query=request.query,
@@ -118,7 +187,7 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 @app.get("/status/{url:path}")
-async def get_url_status(url: str):
+async def get_url_status(url: str, db: MetadataDB = Depends(get_db)):
     """Get the processing status of a specific URL"""
     status = db.get_url_status(url)
     
@@ -128,7 +197,7 @@ async def get_url_status(url: str):
     return status
 
 @app.get("/status")
-async def get_all_status():
+async def get_all_status(db: MetadataDB = Depends(get_db)):
     """Get the status of all URLs"""
     urls = db.get_all_urls()
     return {
@@ -137,11 +206,11 @@ async def get_all_status():
     }
 
 @app.get("/queue-info")
-async def queue_info():
+async def queue_info(queue: AsyncRedisQueue = Depends(get_queue)):
     """Get information about the processing queue"""
     return {
-        "queue_length": queue.get_queue_length(),
-        "redis_connected": queue.is_connected()
+        "queue_length": await queue.get_queue_length(),
+        "redis_connected": await queue.is_connected()
     }
 
 if __name__ == "__main__":
@@ -1,25 +1,86 @@
 import redis
+import redis.asyncio
 import json
+import time
+from typing import List, Optional
 from app.config import REDIS_HOST, REDIS_PORT, REDIS_DB
 
-class RedisQueue:
+# Shared connection pool so every RedisQueue reuses the same sockets
+pool = redis.ConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    max_connections=32,
+    decode_responses=True,
+    socket_keepalive=True
+)
+
+# Separate pool for the async client used by the FastAPI event loop
+async_pool = redis.asyncio.ConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    max_connections=50,
+    decode_responses=True,
+    socket_keepalive=True
+)
+
+QUEUE_NAME = "url_processing_queue"
+
+# How long a successful/failed ping result is reused by is_connected
+PING_CACHE_SECONDS = 1.0
+
+class _BaseQueue:
+    """Job serialization and ping caching shared by the sync and async queues"""
+    
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.queue_name = QUEUE_NAME
+        self._last_ping_at = 0.0
+        self._last_ping_ok = False
+    
+    @staticmethod
+    def _encode_job(url: str) -> str:
+        """Serialize a URL into a queue job payload"""
+        job_data = {
+            "url": url
+        }
+        return json.dumps(job_data)
+    
+    @staticmethod
+    def _decode_job(job_data: str) -> dict:
+        """Deserialize a queue job payload"""
+        return json.loads(job_data)
+    
+    def _cached_ping(self) -> Optional[bool]:
+        """Return the last ping result if it is still fresh, else None"""
+        if time.monotonic() - self._last_ping_at < PING_CACHE_SECONDS:
+            return self._last_ping_ok
+        return None
+    
+    def _record_ping(self, ok: bool) -> bool:
+        """Remember a ping result for PING_CACHE_SECONDS"""
+        self._last_ping_ok = ok
+        self._last_ping_at = time.monotonic()
+        return ok
+
+
+class RedisQueue(_BaseQueue):
     """Simple Redis queue for managing URL processing jobs"""
     
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            decode_responses=True
-        )
-        self.queue_name = "url_processing_queue"
+        super().__init__(redis.Redis(connection_pool=pool))
     
     def enqueue(self, url: str):
         """Add a URL to the processing queue"""
-        job_data = {
-            "url": url
-        }
-        self.redis_client.rpush(self.queue_name, json.dumps(job_data))
+        self.redis_client.rpush(self.queue_name, self._encode_job(url))
+    
+    def enqueue_many(self, urls: List[str]):
+        """Add several URLs to the processing queue in a single round trip"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for url in urls:
+            pipe.rpush(self.queue_name, self._encode_job(url))
+        pipe.execute()
     
     def dequeue(self) -> dict:
         """Get the next URL from the queue (blocking)"""
@@ -27,17 +88,62 @@ class RedisQueue:
         result = self.redis_client.blpop(self.queue_name, timeout=1)
         if result:
             _, job_data = result
-            return json.loads(job_data)
+            return self._decode_job(job_data)
         return None
     
+    def dequeue_batch(self, max_jobs: int) -> List[dict]:
+        """Get up to max_jobs URLs from the queue, blocking only for the first"""
+        first = self.dequeue()
+        if not first:
+            return []
+        
+        jobs = [first]
+        if max_jobs > 1:
+            # LPOP with a count drains the rest in one round trip (Redis >= 6.2)
+            rest = self.redis_client.lpop(self.queue_name, max_jobs - 1)
+            if rest:
+                jobs.extend(self._decode_job(job_data) for job_data in rest)
+        return jobs
+    
     def get_queue_length(self) -> int:
         """Get the current queue length"""
         return self.redis_client.llen(self.queue_name)
     
     def is_connected(self) -> bool:
         """Check if Redis is connected"""
+        cached = self._cached_ping()
+        if cached is not None:
+            return cached
+        
         try:
             self.redis_client.ping()
-            return True
+            return self._record_ping(True)
+        except:
+            return self._record_ping(False)
+
+
+class AsyncRedisQueue(_BaseQueue):
+    """Non-blocking counterpart of RedisQueue for use inside the API event loop"""
+    
+    def __init__(self):
+        super().__init__(redis.asyncio.Redis(connection_pool=async_pool))
+    
+    async def enqueue(self, url: str):
+        """Add a URL to the processing queue"""
+        await self.redis_client.rpush(self.queue_name, self._encode_job(url))
+    
+    async def get_queue_length(self) -> int:
+        """Get the current queue length"""
+        return await self.redis_client.llen(self.queue_name)
+    
+    async def is_connected(self) -> bool:
+        """Check if Redis is connected"""
+        cached = self._cached_ping()
+        if cached is not None:
+            return cached
+        
+        try:
+            await self.redis_client.ping()
+            return self._record_ping(True)
         except:
-            return False
+            return self._record_ping(False)
@@ -1,36 +1,67 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 from typing import List, Dict
 import re
+from app.config import SCRAPER_MAX_BYTES
+
+# Collapses any run of whitespace (including newlines) to a single space
+_WS = re.compile(r'\s+')
+
+# Matches a single word; used to locate word boundaries for chunking
+_WORD = re.compile(r'\S+')
 
 class WebScraper:
     """Handles web scraping and content extraction"""
     
     def __init__(self):
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': 'gzip, deflate, br'
         }
+        
+        # Reuse TCP/TLS connections across fetches (shared by the worker's scrape threads)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def _download(self, url: str) -> bytes:
+        """Stream the response body, stopping once SCRAPER_MAX_BYTES have been read"""
+        with self.session.get(url, headers=self.headers, stream=True, timeout=(5, 30)) as response:
+            response.raise_for_status()
+            
+            content = bytearray()
+            for block in response.iter_content(65536):
+                content += block
+                if len(content) >= SCRAPER_MAX_BYTES:
+                    del content[SCRAPER_MAX_BYTES:]
+                    break
+            
+            return bytes(content)
     
     def fetch_content(self, url: str) -> str:
         """Fetch and clean content from a URL"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
+            content = self._download(url)
             
             # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            tree = LexborHTMLParser(content)
             
             # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
+            tree.strip_tags(["script", "style", "nav", "footer", "header"])
             
-            # Get text content
-            text = soup.get_text()
+            # Get text content (no separator, so inline tags don't split words)
+            root = tree.body or tree.root
+            text = root.text(separator='', strip=False) if root else ""
             
             # Clean up text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
+            text = _WS.sub(' ', text).strip()
             
             return text
         
@@ -39,13 +70,18 @@ class WebScraper:
     
     def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """Split text into overlapping chunks"""
-        words = text.split()
+        # Record word boundaries once, then slice chunks straight out of the text
+        starts = []
+        ends = []
+        for match in _WORD.finditer(text):
+            starts.append(match.start())
+            ends.append(match.end())
+        
+        n = len(starts)
         chunks = []
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk:
-                chunks.append(chunk)
+        for i in range(0, n, chunk_size - overlap):
+            chunks.append(text[starts[i]:ends[min(i + chunk_size, n) - 1]])
         
         return chunks
     
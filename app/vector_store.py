@@ -1,48 +1,158 @@
+import asyncio
+import hashlib
 import chromadb
+import numpy as np
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
-from app.config import CHROMA_PERSIST_DIR, COLLECTION_NAME, EMBEDDING_MODEL
+from typing import List, Dict, Optional, Tuple
+from app.database import MetadataDB
+from app.config import (
+    CHROMA_PERSIST_DIR, COLLECTION_NAME, EMBEDDING_MODEL,
+    EMBEDDING_BACKEND, ONNX_MODEL_DIR, ONNX_NUM_THREADS, EMBEDDING_BATCH_SIZE, CHROMA_INSERT_BATCH_SIZE
+)
+
+# Concurrent query embeddings are coalesced into one encode call: a batch is
+# flushed once it holds QUERY_BATCH_MAX queries or QUERY_BATCH_WINDOW seconds pass
+QUERY_BATCH_MAX = 16
+QUERY_BATCH_WINDOW = 0.005
 
 class VectorStore:
     """Handles vector storage and retrieval using ChromaDB"""
     
-    def __init__(self):
+    def __init__(self, embedding_cache: Optional[MetadataDB] = None):
         # Initialize ChromaDB client
         self.client = chromadb.Client(Settings(
             persist_directory=CHROMA_PERSIST_DIR,
             anonymized_telemetry=False
         ))
         
-        # Get or create collection
+        # Get or create collection. Embeddings are L2-normalized, so inner
+        # product ranks identically to cosine without the extra norm per hop.
+        # HNSW settings only take effect when the collection is first created.
         self.collection = self.client.get_or_create_collection(
             name=COLLECTION_NAME,
-            metadata={"description": "Web documents for RAG"}
+            metadata={
+                "description": "Web documents for RAG",
+                "hnsw:space": "ip",
+                "hnsw:M": 32,
+                "hnsw:construction_ef": 200,
+                "hnsw:search_ef": 64
+            }
+        )
+        
+        # Embedding model is loaded on first use (see embedding_model)
+        self._embedding_model = None
+        
+        # Optional content-addressed cache so repeated chunks skip the encoder.
+        # Keying the hash by backend/model keeps vectors from different encoders apart.
+        self.embedding_cache = embedding_cache
+        # blake2b keys are capped at 64 bytes, so digest the backend:model name first
+        self._cache_key = hashlib.blake2b(
+            f"{EMBEDDING_BACKEND}:{EMBEDDING_MODEL}".encode(), digest_size=32
+        ).digest()
+        
+        # Query coalescer state, bound to the event loop that created it
+        self._query_loop = None
+        self._query_queue = None
+        self._query_task = None
+    
+    @property
+    def embedding_model(self):
+        """Load the embedding model on first access so count-only callers never pay for it"""
+        if self._embedding_model is None:
+            if EMBEDDING_BACKEND == "onnx":
+                from app.embeddings import OnnxEmbedder
+                self._embedding_model = OnnxEmbedder(EMBEDDING_MODEL, ONNX_MODEL_DIR, ONNX_NUM_THREADS)
+            else:
+                from sentence_transformers import SentenceTransformer
+                self._embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+        return self._embedding_model
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run the embedding model on a list of texts"""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
         )
+    
+    def _embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """Embed chunks, reusing cached vectors and encoding only the misses"""
+        if self.embedding_cache is None:
+            return self._encode(chunks)
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+        hashes = [
+            hashlib.blake2b(chunk.encode(), digest_size=16, key=self._cache_key).digest()
+            for chunk in chunks
+        ]
+        vectors = {
+            h: np.frombuffer(vec, dtype=np.float16).astype(np.float32)
+            for h, vec in self.embedding_cache.get_cached_embeddings(list(set(hashes))).items()
+        }
+        
+        # Encode each distinct missing chunk once
+        text_by_hash = dict(zip(hashes, chunks))
+        misses = [h for h in dict.fromkeys(hashes) if h not in vectors]
+        if misses:
+            encoded = self._encode([text_by_hash[h] for h in misses])
+            
+            # Cached as float16 to halve the size of the cache table
+            self.embedding_cache.cache_embeddings([
+                (h, vec.astype(np.float16).tobytes()) for h, vec in zip(misses, encoded)
+            ])
+            vectors.update(zip(misses, encoded))
+        
+        return np.vstack([vectors[h] for h in hashes])
     
     def add_documents(self, chunks: List[str], metadatas: List[Dict], url: str):
         """Add document chunks to the vector store"""
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(chunks).tolist()
-        
-        # Generate unique IDs for each chunk
-        ids = [f"{url}_{i}" for i in range(len(chunks))]
-        
-        # Add to ChromaDB
-        self.collection.add(
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids
-        )
+        self.add_documents_bulk([(chunks, metadatas, url)])
+    
+    def add_documents_bulk(self, batches: List[Tuple[List[str], List[Dict], str]]):
+        """Add chunks from several URLs, sharing encoder batches and ChromaDB writes"""
+        all_chunks = []
+        all_metadatas = []
+        ids = []
+        for chunks, metadatas, url in batches:
+            all_chunks.extend(chunks)
+            all_metadatas.extend(metadatas)
+            
+            # Generate unique IDs for each chunk
+            ids.extend(f"{url}_{i}" for i in range(len(chunks)))
+        
+        # Generate embeddings for every window before touching the collection,
+        # so an encoder failure leaves previously ingested content intact
+        windows = range(0, len(all_chunks), CHROMA_INSERT_BATCH_SIZE)
+        embeddings = [
+            self._embed_chunks(all_chunks[start:start + CHROMA_INSERT_BATCH_SIZE])
+            for start in windows
+        ]
+        
+        # Drop chunks from earlier ingests of these URLs so re-ingests replace
+        # stale content (ChromaDB's add ignores IDs that already exist)
+        urls = [url for _, _, url in batches]
+        if urls:
+            self.collection.delete(where={"url": {"$in": urls}})
+        
+        # Insert in windows so each ChromaDB write stays bounded on large batches
+        for start, window_embeddings in zip(windows, embeddings):
+            end = start + CHROMA_INSERT_BATCH_SIZE
+            
+            # Add to ChromaDB (chromadb 0.4.x only accepts lists, not ndarrays)
+            self.collection.add(
+                embeddings=window_embeddings.tolist(),
+                documents=all_chunks[start:end],
+                metadatas=all_metadatas[start:end],
+                ids=ids[start:end]
+            )
     
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """Search for relevant documents"""
         # Generate query embedding
-        query_embedding = self.embedding_model.encode([query]).tolist()
+        query_embedding = self.embedding_model.encode(
+            [query], convert_to_numpy=True, normalize_embeddings=True
+        ).tolist()
         
         # Search in ChromaDB
         results = self.collection.query(
@@ -50,7 +160,94 @@ class VectorStore:
             n_results=top_k
         )
         
-        # Format results
+        return self._format_results(results)
+    
+    async def search_async(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Search for relevant documents without blocking the event loop"""
+        # Generate query embedding (batched with other in-flight queries)
+        query_embedding = await self.embed_query(query)
+        
+        # Search in ChromaDB
+        results = await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=[query_embedding.tolist()],
+            n_results=top_k
+        )
+        
+        return self._format_results(results)
+    
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embed a single query, sharing an encoder call with concurrent queries"""
+        loop = asyncio.get_running_loop()
+        
+        # (Re)start the coalescer if this is a different loop or the task has ended
+        if self._query_loop is not loop or self._query_task is None or self._query_task.done():
+            self._query_loop = loop
+            self._query_queue = asyncio.Queue()
+            self._query_task = loop.create_task(self._coalesce_queries(self._query_queue))
+        
+        future = loop.create_future()
+        await self._query_queue.put((query, future))
+        return await future
+    
+    async def close(self):
+        """Stop the query coalescer started on the current event loop"""
+        task = self._query_task
+        if task is None or self._query_loop is not asyncio.get_running_loop():
+            return
+        
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        
+        # Release callers whose queries were still waiting to be batched
+        while not self._query_queue.empty():
+            _, future = self._query_queue.get_nowait()
+            future.cancel()
+        
+        self._query_loop = None
+        self._query_queue = None
+        self._query_task = None
+    
+    async def _coalesce_queries(self, queue: asyncio.Queue):
+        """Background task: drain queued queries in batches and encode them together"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            pending = [await queue.get()]
+            
+            try:
+                deadline = loop.time() + QUERY_BATCH_WINDOW
+                while len(pending) < QUERY_BATCH_MAX:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        pending.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                embeddings = await asyncio.to_thread(self._encode, [query for query, _ in pending])
+            
+            except asyncio.CancelledError:
+                for _, future in pending:
+                    future.cancel()
+                raise
+            
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(pending, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+    
+    def _format_results(self, results: Dict) -> List[Dict]:
+        """Flatten a single-query ChromaDB result into a list of chunks"""
         formatted_results = []
         if results['documents'] and len(results['documents']) > 0:
             for i in range(len(results['documents'][0])):
@@ -1,66 +1,129 @@
 """
 Background worker for processing URLs from the Redis queue
 """
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from app.queue import RedisQueue
 from app.database import MetadataDB
 from app.vector_store import VectorStore
 from app.scraper import WebScraper
 
+# Max jobs drained from the queue per iteration
+BATCH_SIZE = 16
+
+# Scraping is network bound, so fetch a batch concurrently
+SCRAPE_WORKERS = 8
+
+logger = logging.getLogger("worker")
+
+def setup_logging() -> QueueListener:
+    """Send log records through a queue so stdout writes happen on a background thread"""
+    log_queue = SimpleQueue()
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    # QueueHandler.prepare() bakes its formatter's output into record.msg, so it
+    # must only pass the message through; the StreamHandler adds the prefix
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+def process_batch(jobs, db, vector_store, scraper, executor):
+    """Scrape, embed and store a batch of jobs, committing statuses together"""
+    # A URL submitted twice would otherwise produce duplicate chunk IDs in one insert
+    urls = list(dict.fromkeys(job['url'] for job in jobs))
+    logger.info("Processing %d URL(s): %s", len(urls), ", ".join(urls))
+    
+    # Update status to processing
+    db.update_statuses_bulk([(url, "processing", None, 0) for url in urls])
+    
+    # Scrape and process the URLs concurrently
+    futures = [(url, executor.submit(scraper.process_url, url)) for url in urls]
+    
+    records = []
+    batches = []
+    for url, future in futures:
+        try:
+            chunks, metadatas = future.result()
+            logger.info("Extracted %d chunks from %s", len(chunks), url)
+            batches.append((chunks, metadatas, url))
+        
+        except Exception as e:
+            error_msg = str(e)
+            records.append((url, "failed", error_msg, 0))
+            logger.error("Failed to process %s: %s", url, error_msg)
+    
+    if batches:
+        try:
+            # Store every scraped URL in the vector database in one go
+            vector_store.add_documents_bulk(batches)
+            logger.info("Stored chunks from %d URL(s) in vector database", len(batches))
+            
+            for chunks, _, url in batches:
+                records.append((url, "completed", None, len(chunks)))
+                logger.info("Successfully processed %s", url)
+        
+        except Exception as e:
+            # Retry URL by URL so only the page that actually fails is marked failed
+            logger.warning("Bulk insert failed (%s), retrying %d URL(s) individually", e, len(batches))
+            for chunks, metadatas, url in batches:
+                try:
+                    vector_store.add_documents(chunks, metadatas, url)
+                    records.append((url, "completed", None, len(chunks)))
+                    logger.info("Successfully processed %s", url)
+                
+                except Exception as e:
+                    error_msg = str(e)
+                    records.append((url, "failed", error_msg, 0))
+                    logger.error("Failed to process %s: %s", url, error_msg)
+    
+    # Update final statuses in a single transaction
+    db.update_statuses_bulk(records)
+
 def main():
     """Main worker loop"""
-    print("Starting worker...")
+    logger.info("Starting worker...")
     
     # Initialize components
     queue = RedisQueue()
     db = MetadataDB()
-    vector_store = VectorStore()
+    vector_store = VectorStore(embedding_cache=db)
     scraper = WebScraper()
     
-    print("Worker initialized. Waiting for jobs...")
+    logger.info("Worker initialized. Waiting for jobs...")
     
-    while True:
-        try:
-            # Get next job from queue
-            job = queue.dequeue()
-            
-            if job:
-                url = job['url']
-                print(f"\nProcessing URL: {url}")
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+        while True:
+            try:
+                # Get the next batch of jobs from the queue
+                jobs = queue.dequeue_batch(BATCH_SIZE)
                 
-                try:
-                    # Update status to processing
-                    db.update_status(url, "processing")
-                    
-                    # Scrape and process the URL
-                    chunks, metadatas = scraper.process_url(url)
-                    print(f"Extracted {len(chunks)} chunks from {url}")
-                    
-                    # Store in vector database
-                    vector_store.add_documents(chunks, metadatas, url)
-                    print(f"Stored chunks in vector database")
-                    
-                    # Update status to completed
-                    db.update_status(url, "completed", chunks_count=len(chunks))
-                    print(f"✓ Successfully processed {url}")
+                if jobs:
+                    process_batch(jobs, db, vector_store, scraper, executor)
                 
-                except Exception as e:
-                    # Update status to failed
-                    error_msg = str(e)
-                    db.update_status(url, "failed", error_message=error_msg)
-                    print(f"✗ Failed to process {url}: {error_msg}")
+                else:
+                    # No jobs available, wait a bit
+                    time.sleep(1)
             
-            else:
-                # No jobs available, wait a bit
-                time.sleep(1)
-        
-        except KeyboardInterrupt:
-            print("\nWorker stopped by user")
-            break
-        
-        except Exception as e:
-            print(f"Worker error: {str(e)}")
-            time.sleep(5)
+            except KeyboardInterrupt:
+                logger.info("Worker stopped by user")
+                break
+            
+            except Exception as e:
+                logger.exception("Worker error: %s", e)
+                time.sleep(5)
 
 if __name__ == "__main__":
-    main()
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()